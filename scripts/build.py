@@ -1,8 +1,13 @@
 import os
 import sys
 import shutil
+import stat
+import argparse
 import subprocess
+import importlib.util
+import importlib.metadata
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # 切换到项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
@@ -16,7 +21,47 @@ ICON_FILE = "assets/icon.ico"
 # 源代码目录
 SRC_DIR = "src"
 
-EXCLUDE_MODULES = []
+# 输出目录
+DIST_DIR = "dist"
+
+# PyInstaller 工作目录，跨次构建保留以复用分析结果
+WORK_DIR = Path.home() / ".cache" / "authvault-pyi"
+
+# 排除不需要打包的模块
+EXCLUDE_MODULES = [
+    # 标准库中的测试与开发工具
+    "test",
+    "tkinter.test",
+    "sqlite3.test",
+    "unittest",
+    "pydoc_data",
+    "distutils",
+    "lib2to3",
+    "setuptools",
+    # 开发环境中可能被误引入的大型第三方库
+    "tornado",
+    "IPython",
+    "jupyter",
+    "matplotlib",
+    "pandas",
+    "scipy",
+    "torch",
+    "tensorflow",
+]
+
+# 固定的 PyInstaller 版本
+PYINSTALLER_VERSION = "6.11.1"
+
+# pip 缓存目录，重复安装时直接复用已下载的 wheel
+PIP_CACHE_DIR = Path.home() / ".cache" / "authvault-pip"
+
+# Windows 下没有控制台时，避免子进程额外创建控制台窗口
+SUBPROCESS_KWARGS = {}
+if sys.platform == "win32":
+    import ctypes
+
+    if not ctypes.windll.kernel32.GetConsoleWindow():
+        SUBPROCESS_KWARGS["creationflags"] = subprocess.CREATE_NO_WINDOW
 
 # 需要的隐式导入
 HIDDEN_IMPORTS = [
@@ -31,31 +76,77 @@ HIDDEN_IMPORTS = [
 ]
 
 
-def clean_build():
-    """清理构建目录"""
+def ensure_package(package, version):
+    """确保已安装指定包，缺失时从 wheel 缓存安装固定版本，返回已安装的版本"""
+    try:
+        return importlib.metadata.version(package)
+    except importlib.metadata.PackageNotFoundError:
+        pass
+
+    print(f"正在安装 {package}=={version}...")
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--cache-dir",
+            str(PIP_CACHE_DIR),
+            "--only-binary=:all:",
+            f"{package}=={version}",
+        ],
+        check=True,
+        **SUBPROCESS_KWARGS,
+    )
+    return version
+
+
+def _remove_readonly(func, path, exc_info):
+    """删除失败时清除只读属性后重试"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def clean_build(full=False):
+    """清理构建目录，full 为 True 时同时清理 PyInstaller 工作目录"""
     print("清理旧的构建文件...")
 
-    dirs_to_remove = ["build", "dist", "__pycache__", "src/__pycache__"]
+    dirs_to_remove = [DIST_DIR, "__pycache__", "src/__pycache__"]
+    if full:
+        dirs_to_remove += ["build", str(WORK_DIR)]
 
     for dir_name in dirs_to_remove:
         if os.path.exists(dir_name):
-            shutil.rmtree(dir_name)
+            shutil.rmtree(dir_name, onerror=_remove_readonly)
             print(f"已删除: {dir_name}/")
 
 
-def check_dependencies():
-    """检查必要的依赖"""
+def _can_import(module):
+    """尝试导入模块"""
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def check_dependencies(deep=False):
+    """检查必要的依赖，deep 为 True 时实际导入各模块"""
     print("检查依赖...")
 
     required = ["pyotp", "cryptography", "cv2", "PIL", "numpy"]
-    missing = []
 
-    for module in required:
-        try:
-            __import__(module)
-        except ImportError:
-            print(f"{module} 缺失...")
-            missing.append(module)
+    # 仅查找模块位置，不执行模块代码
+    missing = [m for m in required if importlib.util.find_spec(m) is None]
+
+    # 并行导入，确认动态库等可以正常加载
+    if deep and not missing:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(_can_import, required))
+        missing = [m for m, ok in zip(required, results) if not ok]
+
+    for module in missing:
+        print(f"{module} 缺失...")
 
     if missing:
         print(f"缺少依赖: {', '.join(missing)}")
@@ -64,14 +155,14 @@ def check_dependencies():
     return True
 
 
-def build_exe():
+def build_exe(onefile=False, full_clean=False):
     """构建可执行文件"""
     print("开始构建可执行文件...")
 
     # 检查图标文件
     icon_arg = []
     if os.path.exists(ICON_FILE):
-        icon_arg = [f"--icon={ICON_FILE}"]
+        icon_arg = [f"--icon={os.path.abspath(ICON_FILE)}"]
         print(f"使用图标: {ICON_FILE}")
     else:
         print(f"未找到图标文件: {ICON_FILE}")
@@ -82,17 +173,24 @@ def build_exe():
         "-m",
         "PyInstaller",
         f"--name={APP_NAME}",
-        "--onefile",
+        "--onefile" if onefile else "--onedir",
         "--windowed",
-        "--clean",
         "--noconfirm",
+        f"--workpath={WORK_DIR}",
+        f"--distpath={DIST_DIR}",
+        # spec 文件随构建参数生成，放在工作目录中，不覆盖仓库文件
+        f"--specpath={WORK_DIR}",
     ]
 
+    # 完全重新构建时清除 PyInstaller 缓存
+    if full_clean:
+        args.append("--clean")
+
     # 添加图标
     args.extend(icon_arg)
 
-    # 添加 src 目录到数据文件
-    args.append(f"--add-data={SRC_DIR};{SRC_DIR}")
+    # 添加 src 目录到数据文件（spec 不在项目根目录，使用绝对路径）
+    args.append(f"--add-data={os.path.abspath(SRC_DIR)};{SRC_DIR}")
 
     # 添加隐式导入
     for module in HIDDEN_IMPORTS:
@@ -102,12 +200,22 @@ def build_exe():
     for module in EXCLUDE_MODULES:
         args.append(f"--exclude-module={module}")
 
+    # 去除调试符号，仅在非 Windows 系统上构建时生效，Windows 发布版不受影响
+    if sys.platform != "win32":
+        args.append("--strip")
+
+    # 使用 UPX 压缩
+    upx_path = shutil.which("upx")
+    if upx_path:
+        args.append(f"--upx-dir={os.path.dirname(upx_path)}")
+        print(f"使用 UPX: {upx_path}")
+
     # 主脚本
     args.append(MAIN_SCRIPT)
 
     print(f"执行命令: PyInstaller {APP_NAME}")
 
-    result = subprocess.run(args)
+    result = subprocess.run(args, **SUBPROCESS_KWARGS)
 
     if result.returncode == 0:
         print("构建成功！")
@@ -117,35 +225,80 @@ def build_exe():
         return False
 
 
-def create_distribution():
+def create_distribution(onefile=False):
     """创建发布目录"""
     print("创建发布目录...")
 
     dist_dir = Path("release")
     dist_dir.mkdir(exist_ok=True)
 
-    exe_name = f"{APP_NAME}.exe"
-    src_exe = Path("dist") / exe_name
-    dest_exe = dist_dir / exe_name
-
-    if src_exe.exists():
-        shutil.copy(src_exe, dest_exe)
-        print(f"已复制: {exe_name} -> release/")
-
-        # 计算文件大小
-        size_bytes = dest_exe.stat().st_size
-        size_mb = size_bytes / (1024 * 1024)
-        print(f"文件大小: {size_mb:.2f} MB")
+    if onefile:
+        exe_name = f"{APP_NAME}.exe"
+        src_exe = Path(DIST_DIR) / exe_name
+        dest_exe = dist_dir / exe_name
+
+        if src_exe.exists():
+            shutil.copy(src_exe, dest_exe)
+            print(f"已复制: {exe_name} -> release/")
+
+            # 计算文件大小
+            size_bytes = dest_exe.stat().st_size
+            size_mb = size_bytes / (1024 * 1024)
+            print(f"文件大小: {size_mb:.2f} MB")
+        else:
+            print(f"错误: 未找到 {src_exe}")
+            return False
     else:
-        print(f"错误: 未找到 {src_exe}")
-        return False
+        src_dir = Path(DIST_DIR) / APP_NAME
+
+        if src_dir.is_dir():
+            # 打包整个目录为 zip
+            archive = shutil.make_archive(
+                str(dist_dir / APP_NAME), "zip", DIST_DIR, APP_NAME
+            )
+            print(f"已打包: {APP_NAME}/ -> release/{Path(archive).name}")
+
+            # 计算文件大小
+            size_bytes = sum(
+                f.stat().st_size for f in src_dir.rglob("*") if f.is_file()
+            )
+            size_mb = size_bytes / (1024 * 1024)
+            zip_mb = Path(archive).stat().st_size / (1024 * 1024)
+            print(f"目录大小: {size_mb:.2f} MB")
+            print(f"压缩包大小: {zip_mb:.2f} MB")
+        else:
+            print(f"错误: 未找到 {src_dir}")
+            return False
 
     print(f"\n发布目录: {dist_dir.absolute()}")
     return True
 
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description=f"{APP_NAME} 打包工具")
+    parser.add_argument(
+        "--single",
+        action="store_true",
+        help="打包为单个 exe（每次启动需解压，启动较慢）",
+    )
+    parser.add_argument(
+        "--full-clean",
+        action="store_true",
+        help="清除构建缓存后完全重新构建（用于正式发布）",
+    )
+    parser.add_argument(
+        "--deep-check",
+        action="store_true",
+        help="实际导入各依赖以确认可用",
+    )
+    return parser.parse_args()
+
+
 def main():
     """主函数"""
+    options = parse_args()
+
     print("=" * 60)
     print(f"{APP_NAME} 打包工具")
     print("=" * 60)
@@ -153,25 +306,20 @@ def main():
     print("=" * 60)
 
     # 检查 PyInstaller
-    try:
-        import PyInstaller
-
-        print(f"PyInstaller 版本: {PyInstaller.__version__}")
-    except ImportError:
-        print("正在安装 PyInstaller...")
-        subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    version = ensure_package("pyinstaller", PYINSTALLER_VERSION)
+    print(f"PyInstaller 版本: {version}")
 
     # 检查依赖
-    if not check_dependencies():
+    if not check_dependencies(deep=options.deep_check):
         print("请先安装缺失的依赖后再运行打包！")
         sys.exit(1)
 
     # 清理旧文件
-    clean_build()
+    clean_build(full=options.full_clean)
 
     # 构建
-    if build_exe():
-        create_distribution()
+    if build_exe(onefile=options.single, full_clean=options.full_clean):
+        create_distribution(onefile=options.single)
         print("\n" + "=" * 60)
         print("打包完成！")
         print("=" * 60)
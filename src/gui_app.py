@@ -1,14 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import pyotp
+import base64
+import binascii
+import os
+import queue
+import re
+import sys
 import time
-from datetime import datetime
-import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import ctypes
 
 from src.storage_manager import StorageManager
-from src.qr_scanner import scan_qr_and_extract_2fa
-from src.screenshot_tool import capture_and_decode
 
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
@@ -19,7 +23,40 @@ except Exception:
         pass
 
 
+# 密钥中需要去除的空白字符
+_SECRET_STRIP_TABLE = str.maketrans("", "", " \t\r\n")
+
+# 规范化后的 Base32 密钥
+_BASE32_RE = re.compile(r"[A-Z2-7]+=*")
+
+
+def _normalize_secret(secret):
+    """去除密钥中的空白字符并转为大写"""
+    return secret.translate(_SECRET_STRIP_TABLE).upper()
+
+
+# 预先生成的剩余时间文本，按剩余秒数索引
+_REMAINING_TEXTS = tuple(f"剩余时间: {i}s" for i in range(61))
+
+
+@lru_cache(maxsize=512)
+def _make_totp(secret):
+    """按密钥缓存 TOTP 对象，密钥变化时自然失效"""
+    return pyotp.TOTP(secret)
+
+
 class TwoFactorAuthGUI:
+    # 工具栏按钮：(显示文本, 处理方法名)
+    _BUTTON_SPECS = (
+        ("添\u3000\u3000加", "add_account"),
+        ("编\u3000\u3000辑", "edit_account"),
+        ("删\u3000\u3000除", "delete_account"),
+        ("备\u3000\u3000份", "backup_data"),
+        ("导\u3000\u3000入", "restore_data"),
+        ("扫码添加", "scan_qr_add"),
+        ("截图添加", "screenshot_add"),
+    )
+
     def __init__(self, root):
         self.root = root
         self.root.title("2FA 管理器")
@@ -42,9 +79,39 @@ class TwoFactorAuthGUI:
         # 当前选中的账号
         self.selected_account = None
 
-        # 更新线程控制
-        self.update_running = False
-        self.update_thread = None
+        # 已加载到列表中的全部账号及其 ID 索引
+        self._all_accounts = []
+        self._accounts_by_id = {}
+
+        # 搜索索引：(小写名称, 小写备注, 账号 ID)
+        self._search_index = []
+
+        # 搜索延迟任务
+        self._search_after_id = None
+
+        # 选择变化后的延迟刷新任务
+        self._select_after_id = None
+
+        # 当前验证码缓存及其过期时间
+        self._cached_code = None
+        self._next_expiry = 0
+
+        # 进度条当前值
+        self._last_progress = 0
+
+        # 定时任务 ID
+        self._clock_after_id = None
+        self._tick_after_id = None
+
+        # 后台任务线程池，单线程以保证后台任务按顺序执行
+        self._pool = ThreadPoolExecutor(max_workers=1)
+
+        # 后台任务结果队列：(callback, future)，由 _tick 在主线程中取出处理
+        self._results = queue.Queue()
+
+        # 后台任务执行期间禁用工具栏按钮，避免与其他修改同时进行
+        self._busy = False
+        self._toolbar_buttons = []
 
         # 设置窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -56,7 +123,8 @@ class TwoFactorAuthGUI:
         self.load_accounts()
 
         # 启动自动更新
-        self.start_auto_update()
+        self._update_clock()
+        self._tick()
 
     def create_ui(self):
         """创建用户界面"""
@@ -100,7 +168,7 @@ class TwoFactorAuthGUI:
 
         ttk.Label(search_frame, text="搜索: ").pack(side=tk.LEFT, padx=(0, 5))
         self.search_var = tk.StringVar()
-        self.search_var.trace_add("write", self.on_search)
+        self.search_var.trace_add("write", self._schedule_search)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=20)
         search_entry.pack(side=tk.LEFT)
 
@@ -108,27 +176,12 @@ class TwoFactorAuthGUI:
         button_frame = ttk.Frame(toolbar)
         button_frame.pack(side=tk.RIGHT)
 
-        ttk.Button(
-            button_frame, text="添\u3000\u3000加", command=self.add_account, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="编\u3000\u3000辑", command=self.edit_account, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="删\u3000\u3000除", command=self.delete_account, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="备\u3000\u3000份", command=self.backup_data, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="导\u3000\u3000入", command=self.restore_data, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="扫码添加", command=self.scan_qr_add, width=12
-        ).pack(side=tk.LEFT, padx=1)
-        ttk.Button(
-            button_frame, text="截图添加", command=self.screenshot_add, width=12
-        ).pack(side=tk.LEFT, padx=1)
+        for text, method_name in self._BUTTON_SPECS:
+            button = ttk.Button(
+                button_frame, text=text, command=getattr(self, method_name), width=12
+            )
+            button.pack(side=tk.LEFT, padx=1)
+            self._toolbar_buttons.append(button)
 
     def create_account_list(self, parent):
         """创建账号列表"""
@@ -256,54 +309,111 @@ class TwoFactorAuthGUI:
         self.status_label.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5, pady=2)
 
         self.time_status_label = ttk.Label(
-            status_frame, text=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), anchor=tk.E
+            status_frame, text=time.strftime("%Y-%m-%d %H:%M:%S"), anchor=tk.E
         )
         self.time_status_label.grid(row=0, column=1, sticky=tk.E, padx=5, pady=2)
 
     def load_accounts(self):
         """加载账号列表"""
-        # 清空现有列表
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # 清空现有列表（包括搜索时隐藏的项）
+        if self._all_accounts:
+            self.tree.delete(*self._accounts_by_id)
 
         # 加载账号
-        accounts = self.storage.get_all_accounts()
-        for idx, account in enumerate(accounts, 1):
+        self._all_accounts = self.storage.get_all_accounts()
+        self._accounts_by_id = {a["id"]: a for a in self._all_accounts}
+        self._search_index = [
+            (a["name"].lower(), a["note"].lower(), a["id"]) for a in self._all_accounts
+        ]
+
+        for idx, account in enumerate(self._all_accounts, 1):
             self.tree.insert(
                 "",
                 tk.END,
                 iid=account["id"],
-                values=(str(idx), account["name"], account["note"]),
+                values=(idx, account["name"], account["note"]),
             )
 
-        self.update_status(f"已加载 {len(accounts)} 个账号")
+        self.update_status(f"已加载 {len(self._all_accounts)} 个账号")
 
-    def on_search(self, *args):
+    def _add_row(self, account):
+        """在列表末尾添加一个账号"""
+        self._all_accounts.append(account)
+        self._accounts_by_id[account["id"]] = account
+        self._search_index.append(
+            (account["name"].lower(), account["note"].lower(), account["id"])
+        )
+        self.tree.insert(
+            "",
+            tk.END,
+            iid=account["id"],
+            values=(len(self._all_accounts), account["name"], account["note"]),
+        )
+        self._refresh_filter()
+
+    def _update_row(self, account):
+        """更新列表中的一个账号"""
+        account_id = account["id"]
+        pos = self._all_accounts.index(self._accounts_by_id[account_id])
+        self._all_accounts[pos] = account
+        self._accounts_by_id[account_id] = account
+        self._search_index[pos] = (
+            account["name"].lower(),
+            account["note"].lower(),
+            account_id,
+        )
+        self.tree.set(account_id, "name", account["name"])
+        self.tree.set(account_id, "note", account["note"])
+        self._refresh_filter()
+
+    def _remove_row(self, account_id):
+        """从列表中移除一个账号"""
+        pos = self._all_accounts.index(self._accounts_by_id.pop(account_id))
+        del self._all_accounts[pos]
+        del self._search_index[pos]
+        self.tree.delete(account_id)
+
+        if self.search_var.get():
+            self._refresh_filter()
+        else:
+            # 更新后续账号的序号
+            for idx in range(pos, len(self._all_accounts)):
+                self.tree.set(self._all_accounts[idx]["id"], "index", idx + 1)
+
+    def _refresh_filter(self):
+        """列表变化后重新应用当前搜索条件"""
+        if self.search_var.get():
+            self.on_search()
+
+    def _schedule_search(self, *args):
+        """延迟执行搜索，合并连续输入"""
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(120, self.on_search)
+
+    def on_search(self):
         """搜索账号"""
+        self._search_after_id = None
         search_text = self.search_var.get().lower()
 
-        # 清空列表
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # 重新加载过滤后的账号
-        accounts = self.storage.get_all_accounts()
+        # 隐藏不匹配的项，重新挂载匹配的项
         idx = 0
-        for account in accounts:
-            if (
-                search_text in account["name"].lower()
-                or search_text in account["note"].lower()
-            ):
+        for name, note, iid in self._search_index:
+            if search_text in name or search_text in note:
+                self.tree.reattach(iid, "", idx)
                 idx += 1
-                self.tree.insert(
-                    "",
-                    tk.END,
-                    iid=account["id"],
-                    values=(str(idx), account["name"], account["note"]),
-                )
+                self.tree.set(iid, "index", idx)
+            else:
+                self.tree.detach(iid)
 
     def on_account_select(self, event):
-        """账号选择事件"""
+        """账号选择事件，连续触发时合并到空闲时处理一次"""
+        if self._select_after_id is None:
+            self._select_after_id = self.root.after_idle(self._apply_selection)
+
+    def _apply_selection(self):
+        """根据当前选中项更新验证码显示"""
+        self._select_after_id = None
         selection = self.tree.selection()
         if not selection:
             self.selected_account = None
@@ -311,7 +421,7 @@ class TwoFactorAuthGUI:
             return
 
         account_id = selection[0]
-        account = self.storage.get_account(account_id)
+        account = self._accounts_by_id.get(account_id)
 
         if account:
             self.selected_account = account
@@ -324,33 +434,58 @@ class TwoFactorAuthGUI:
             return
 
         # 更新账号信息
-        self.account_name_label.config(text=self.selected_account["name"])
-        self.account_note_label.config(text=self.selected_account["note"] or "-")
+        self._set(self.account_name_label, "text", self.selected_account["name"])
+        self._set(self.account_note_label, "text", self.selected_account["note"] or "-")
 
         # 更新密钥显示
         self.toggle_key_display()
 
-        # 生成验证码
-        try:
-            totp = pyotp.TOTP(self.selected_account["secret"])
-            code = totp.now()
-            remaining = totp.interval - (datetime.now().timestamp() % totp.interval)
+        # 账号变化后需重新生成验证码
+        self._next_expiry = 0
+        self.refresh_code(time.time())
 
-            self.code_label.config(text=code)
-            self.time_label.config(text=f"剩余时间: {int(remaining)}s")
-            self.progress_bar["value"] = remaining
+    def refresh_code(self, now):
+        """刷新验证码与剩余时间，仅在周期结束时重新生成验证码"""
+        try:
+            totp = _make_totp(self.selected_account["secret"])
+            remaining = self._next_expiry - now
+
+            # 周期结束，或系统时间回拨导致剩余时间超过一个周期
+            if not 0 < remaining <= totp.interval:
+                self._cached_code = totp.at(now)
+                self._next_expiry = (int(now) // totp.interval + 1) * totp.interval
+                self._set(self.code_label, "text", self._cached_code)
+                remaining = self._next_expiry - now
         except Exception as e:
-            self.code_label.config(text="错误")
+            self._set(self.code_label, "text", "错误")
             self.update_status(f"生成验证码失败: {str(e)}")
+            return
+
+        # 限制在预生成文本的范围内
+        index = min(max(int(remaining), 0), len(_REMAINING_TEXTS) - 1)
+        self._set(self.time_label, "text", _REMAINING_TEXTS[index])
+        self._set_progress(round(remaining, 1))
+
+    @staticmethod
+    def _set(widget, key, value):
+        """仅在值变化时更新控件属性"""
+        if widget.cget(key) != value:
+            widget[key] = value
+
+    def _set_progress(self, value):
+        """仅在值变化时更新进度条"""
+        if value != self._last_progress:
+            self.progress_bar["value"] = value
+            self._last_progress = value
 
     def clear_code_display(self):
         """清空验证码显示"""
-        self.account_name_label.config(text="-")
-        self.account_note_label.config(text="-")
-        self.code_label.config(text="------")
-        self.time_label.config(text="剩余时间: --s")
-        self.progress_bar["value"] = 0
-        self.key_label.config(text="")
+        self._set(self.account_name_label, "text", "-")
+        self._set(self.account_note_label, "text", "-")
+        self._set(self.code_label, "text", "------")
+        self._set(self.time_label, "text", "剩余时间: --s")
+        self._set_progress(0)
+        self._set(self.key_label, "text", "")
 
     def toggle_key_display(self):
         """切换密钥显示"""
@@ -378,18 +513,22 @@ class TwoFactorAuthGUI:
         dialog = AccountDialog(self.root, "添加账号")
         if dialog.result:
             account_data = dialog.result
-            success, message = self.storage.add_account(
+            success, result = self.storage.add_account(
                 account_data["name"], account_data["secret"], account_data["note"]
             )
 
             if success:
-                self.load_accounts()
+                self._add_row(self.storage.get_account(result))
                 self.update_status("账号添加成功")
             else:
-                messagebox.showerror("错误", message)
+                messagebox.showerror("错误", result)
 
     def edit_account(self):
         """编辑账号"""
+        # 双击列表也会触发编辑，后台任务执行期间忽略
+        if self._busy:
+            return
+
         if not self.selected_account:
             messagebox.showwarning("提示", "请先选择要编辑的账号")
             return
@@ -405,10 +544,10 @@ class TwoFactorAuthGUI:
             )
 
             if success:
-                self.load_accounts()
                 self.selected_account = self.storage.get_account(
                     self.selected_account["id"]
                 )
+                self._update_row(self.selected_account)
                 self.update_code_display()
                 self.update_status("账号更新成功")
             else:
@@ -426,8 +565,8 @@ class TwoFactorAuthGUI:
             success, message = self.storage.delete_account(self.selected_account["id"])
 
             if success:
+                self._remove_row(self.selected_account["id"])
                 self.selected_account = None
-                self.load_accounts()
                 self.clear_code_display()
                 self.update_status("账号删除成功")
             else:
@@ -438,36 +577,45 @@ class TwoFactorAuthGUI:
         filename = filedialog.asksaveasfilename(
             defaultextension=".2fa",
             filetypes=[("2FA 备份文件", "*.2fa"), ("所有文件", "*.*")],
-            initialfile=f"2fa_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.2fa",
+            initialfile=f"2fa_backup_{time.strftime('%Y%m%d_%H%M%S')}.2fa",
         )
 
-        if filename:
-            success, message = self.storage.backup(filename)
+        if not filename:
+            return
+
+        def on_done(success, message):
+            """备份完成回调"""
             if success:
                 messagebox.showinfo("成功", "数据备份成功！")
                 self.update_status(f"备份已保存: {filename}")
             else:
                 messagebox.showerror("错误", f"备份失败: {message}")
 
+        self._run_in_background("正在备份...", on_done, self.storage.backup, filename)
+
     def restore_data(self):
         """恢复数据"""
         filename = filedialog.askopenfilename(
             filetypes=[("2FA 备份文件", "*.2fa"), ("所有文件", "*.*")]
         )
 
-        if filename:
-            if messagebox.askyesno(
-                "确认恢复", "恢复数据将覆盖当前所有账号，确定继续吗？"
-            ):
-                success, message = self.storage.restore(filename)
-                if success:
-                    self.selected_account = None
-                    self.load_accounts()
-                    self.clear_code_display()
-                    messagebox.showinfo("成功", "数据恢复成功！")
-                    self.update_status(f"从备份恢复: {filename}")
-                else:
-                    messagebox.showerror("错误", f"恢复失败: {message}")
+        if not filename or not messagebox.askyesno(
+            "确认恢复", "恢复数据将覆盖当前所有账号，确定继续吗？"
+        ):
+            return
+
+        def on_done(success, message):
+            """恢复完成回调"""
+            if success:
+                self.selected_account = None
+                self.load_accounts()
+                self.clear_code_display()
+                messagebox.showinfo("成功", "数据恢复成功！")
+                self.update_status(f"从备份恢复: {filename}")
+            else:
+                messagebox.showerror("错误", f"恢复失败: {message}")
+
+        self._run_in_background("正在恢复...", on_done, self.storage.restore, filename)
 
     def scan_qr_add(self):
         """扫描二维码添加账号"""
@@ -484,40 +632,46 @@ class TwoFactorAuthGUI:
         if not filename:
             return
 
-        # 解析二维码
-        info, error = scan_qr_and_extract_2fa(filename)
+        # 解析二维码（按需导入，避免启动时加载 cv2 等依赖）
+        from src.qr_scanner import scan_qr_and_extract_2fa
 
-        if error:
-            messagebox.showerror("错误", f"二维码解析失败: \n{error}")
-            return
+        def on_done(info, error):
+            """二维码解析完成回调"""
+            if error:
+                messagebox.showerror("错误", f"二维码解析失败: \n{error}")
+                return
 
-        # 显示解析结果并确认添加
-        result_msg = (
-            f"解析成功！\n\n"
-            f"发行者: {info['issuer']}\n"
-            f"账号: {info['account']}\n"
-            f"密钥: {info['secret']}\n\n"
-            f"是否添加此账号？"
-        )
+            # 显示解析结果并确认添加
+            result_msg = (
+                f"解析成功！\n\n"
+                f"发行者: {info['issuer']}\n"
+                f"账号: {info['account']}\n"
+                f"密钥: {info['secret']}\n\n"
+                f"是否添加此账号？"
+            )
 
-        if messagebox.askyesno("确认添加", result_msg):
-            # 生成账号名称
-            if info["issuer"]:
-                name = f"{info['issuer']} ({info['account']})"
-            else:
-                name = info["account"]
+            if messagebox.askyesno("确认添加", result_msg):
+                # 生成账号名称
+                if info["issuer"]:
+                    name = f"{info['issuer']} ({info['account']})"
+                else:
+                    name = info["account"]
 
-            # 添加账号
-            success, message = self.storage.add_account(
-                name, info["secret"], f"从二维码导入 - {info['account']}"
-            )
+                # 添加账号
+                success, result = self.storage.add_account(
+                    name, info["secret"], f"从二维码导入 - {info['account']}"
+                )
 
-            if success:
-                self.load_accounts()
-                self.update_status(f"账号 '{name}' 添加成功")
-                messagebox.showinfo("成功", f"账号 '{name}' 已添加！")
-            else:
-                messagebox.showerror("错误", message)
+                if success:
+                    self._add_row(self.storage.get_account(result))
+                    self.update_status(f"账号 '{name}' 添加成功")
+                    messagebox.showinfo("成功", f"账号 '{name}' 已添加！")
+                else:
+                    messagebox.showerror("错误", result)
+
+        self._run_in_background(
+            "正在解析二维码...", on_done, scan_qr_and_extract_2fa, filename
+        )
 
     def screenshot_add(self):
         """截图识别二维码添加账号"""
@@ -545,54 +699,99 @@ class TwoFactorAuthGUI:
                     name = info["account"]
 
                 # 添加账号
-                success, message = self.storage.add_account(
+                success, result = self.storage.add_account(
                     name, info["secret"], f"从截图导入 - {info['account']}"
                 )
 
                 if success:
-                    self.load_accounts()
+                    self._add_row(self.storage.get_account(result))
                     self.update_status(f"账号 '{name}' 添加成功")
                     messagebox.showinfo("成功", f"账号 '{name}' 已添加！")
                 else:
-                    messagebox.showerror("错误", message)
+                    messagebox.showerror("错误", result)
 
-        # 启动截图工具
-        capture_and_decode(self.root, on_result)
+        # 按需导入，避免启动时加载 PIL 等依赖
+        from src.screenshot_tool import ScreenshotTool, decode_capture
 
-    def start_auto_update(self):
-        """启动自动更新线程"""
-        self.update_running = True
-        self.update_thread = threading.Thread(target=self.auto_update_loop, daemon=True)
-        self.update_thread.start()
+        def on_capture(image):
+            """截图完成后在后台线程识别二维码"""
+            self._run_in_background(
+                "正在识别二维码...", on_result, decode_capture, image
+            )
 
-    def auto_update_loop(self):
-        """自动更新循环"""
-        while self.update_running:
+        ScreenshotTool(callback=on_capture).start(self.root)
+
+    def _run_in_background(self, message, callback, func, *args):
+        """
+        在后台线程执行耗时操作，完成后在主线程中以其返回值调用 callback
+        执行期间禁用工具栏按钮
+        """
+        self.update_status(message)
+        self._set_busy(True)
+
+        # 后台线程只把结果放入队列，不调用任何 Tk 方法
+        self._pool.submit(func, *args).add_done_callback(
+            lambda future: self._results.put((callback, future))
+        )
+
+    def _process_results(self):
+        """在主线程中处理已完成的后台任务"""
+        while True:
             try:
-                # 更新验证码显示
-                if self.selected_account:
-                    self.root.after(0, self.update_code_display)
-
-                # 更新状态栏时间
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.root.after(
-                    0, lambda: self.time_status_label.config(text=current_time)
-                )
+                callback, future = self._results.get_nowait()
+            except queue.Empty:
+                return
 
-            except Exception as e:
-                print(f"更新错误: {e}")
+            self._set_busy(False)
+            callback(*future.result())
+
+    def _set_busy(self, busy):
+        """设置后台任务状态，同步光标和工具栏按钮"""
+        self._busy = busy
+        self.root.config(cursor="watch" if busy else "")
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in self._toolbar_buttons:
+            button.config(state=state)
+
+    def _update_clock(self):
+        """更新状态栏时间，并在下一秒开始时再次更新"""
+        now = time.time()
+        self._set(
+            self.time_status_label,
+            "text",
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+        )
+        self._clock_after_id = self.root.after(
+            1000 - int(now * 1000) % 1000, self._update_clock
+        )
+
+    def _tick(self):
+        """定时处理后台任务结果，并刷新验证码倒计时（窗口最小化或隐藏时跳过）"""
+        # 先安排下一次刷新，本次出错也不会中断定时任务
+        self._tick_after_id = self.root.after(250, self._tick)
+
+        self._process_results()
 
-            time.sleep(1)
+        if self.selected_account and self.root.winfo_viewable():
+            self.refresh_code(time.time())
 
     def update_status(self, message):
         """更新状态栏"""
-        self.status_label.config(text=message)
+        self._set(self.status_label, "text", message)
 
     def on_closing(self):
         """窗口关闭事件"""
-        self.update_running = False
-        if self.update_thread:
-            self.update_thread.join(timeout=1)
+        # 取消尚未执行的定时任务
+        for after_id in (
+            self._clock_after_id,
+            self._tick_after_id,
+            self._search_after_id,
+            self._select_after_id,
+        ):
+            if after_id:
+                self.root.after_cancel(after_id)
+
+        self._pool.shutdown(wait=False)
         self.root.destroy()
 
 
@@ -634,7 +833,7 @@ class AccountDialog(simpledialog.Dialog):
     def validate(self):
         """验证输入"""
         name = self.name_entry.get().strip()
-        secret = self.secret_entry.get().strip().upper().replace(" ", "")
+        secret = _normalize_secret(self.secret_entry.get())
 
         if not name:
             messagebox.showwarning("提示", "请输入账号名称")
@@ -644,35 +843,59 @@ class AccountDialog(simpledialog.Dialog):
             messagebox.showwarning("提示", "请输入密钥")
             return False
 
-        # 验证密钥格式
+        # 验证密钥格式，先用正则排除非 Base32 字符，再校验长度
+        if not _BASE32_RE.fullmatch(secret):
+            messagebox.showwarning("提示", "密钥格式无效")
+            return False
+
         try:
-            pyotp.TOTP(secret).now()
-        except Exception:
+            base64.b32decode(secret + "=" * (-len(secret) % 8))
+        except (binascii.Error, ValueError):
             messagebox.showwarning("提示", "密钥格式无效")
             return False
 
+        # 保存规范化后的密钥供 apply 使用
+        self._secret = secret
         return True
 
     def apply(self):
         """应用结果"""
         self.result = {
             "name": self.name_entry.get().strip(),
-            "secret": self.secret_entry.get().strip().upper().replace(" ", ""),
+            "secret": self._secret,
             "note": self.note_entry.get().strip(),
         }
 
 
 def main():
     """主函数"""
-    root = tk.Tk()
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        # 无图形环境时无法弹出对话框，直接输出到标准错误
+        sys.stderr.write(f"无法启动图形界面: {e}\n")
+        sys.exit(1)
 
     try:
         root.iconbitmap("icon.ico")
     except:
         pass
 
-    app = TwoFactorAuthGUI(root)
-    root.mainloop()
+    # 设置 AUTHVAULT_PROFILE 环境变量时记录启动和运行过程的性能数据
+    profiler = None
+    if os.environ.get("AUTHVAULT_PROFILE"):
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        app = TwoFactorAuthGUI(root)
+        root.mainloop()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats("authvault.prof")
 
 
 if __name__ == "__main__":
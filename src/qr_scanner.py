@@ -1,69 +1,148 @@
 import sys
 import re
-from urllib.parse import urlparse, parse_qs, unquote
+import importlib.util
+from functools import lru_cache
+from urllib.parse import unquote, unquote_plus
 
-# 导入 cv2
-try:
+# 解码库较重，只检查是否安装，首次解码时再导入
+CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
+PYZBAR_AVAILABLE = (
+    importlib.util.find_spec("pyzbar") is not None
+    and importlib.util.find_spec("PIL") is not None
+)
+
+# 二维码检测时图像的最大边长
+MAX_DETECT_SIDE = 1600
+
+
+@lru_cache(maxsize=1)
+def _load_cv2():
+    """首次使用时导入 cv2"""
     import cv2
 
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+    return cv2
 
-# 导入 pyzbar
-PYZBAR_AVAILABLE = False
-try:
+
+@lru_cache(maxsize=1)
+def _load_pyzbar():
+    """首次使用时导入 PIL 和 pyzbar"""
     from PIL import Image
-    from pyzbar.pyzbar import decode
+    from pyzbar.pyzbar import decode, ZBarSymbol
+
+    return Image, decode, ZBarSymbol
+
+
+@lru_cache(maxsize=1)
+def get_cv2_detector():
+    """获取复用的 OpenCV 二维码检测器，优先使用更快的 Aruco 版本"""
+    cv2 = _load_cv2()
+    try:
+        return cv2.QRCodeDetectorAruco()
+    except AttributeError:
+        # OpenCV 4.7 以下版本
+        return cv2.QRCodeDetector()
+
+
+def _preprocess_variants(gray, upscale=True):
+    """依次生成用于重试的预处理图像"""
+    cv2 = _load_cv2()
+    # 反色（深色背景上的浅色二维码）
+    yield cv2.bitwise_not(gray)
+    # 局部对比度增强
+    yield cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    # 放大（较小的二维码），仅用于小图
+    if upscale:
+        yield cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+
+
+def decode_qr_gray(gray):
+    """从灰度图中解码二维码，失败时依次尝试预处理后的图像，均失败返回空字符串"""
+    detector = get_cv2_detector()
+
+    # 大图先缩小检测，失败再使用原图
+    scale = MAX_DETECT_SIDE / max(gray.shape[:2])
+    if scale < 1:
+        cv2 = _load_cv2()
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        data, vertices, _ = detector.detectAndDecode(small)
+        if data:
+            return data
+    else:
+        small = gray
+
+    data, vertices, _ = detector.detectAndDecode(gray)
+    if data:
+        return data
+
+    # 预处理重试在缩小后的图像上进行，避免对大图做增强和放大
+    for image in _preprocess_variants(small, upscale=scale >= 1):
+        data, vertices, _ = detector.detectAndDecode(image)
+        if data:
+            return data
+
+    return ""
 
-    PYZBAR_AVAILABLE = True
-except ImportError:
-    pass
-except Exception:
-    pass
+
+def _split_otpauth_uri(uri):
+    """校验 otpauth 前缀并拆分 URI，不是 otpauth URI 时返回 None"""
+    scheme, sep, rest = uri.partition("://")
+    if not sep or scheme.lower() != "otpauth":
+        return None
+
+    rest = rest.partition("#")[0]
+    rest, _, query = rest.partition("?")
+    otp_type, _, path = rest.partition("/")
+    return otp_type, path, query
 
 
 def parse_otpauth_uri(uri):
     # 解析 otpauth URI
     try:
-        parsed = urlparse(uri)
+        parts = _split_otpauth_uri(uri)
+    except Exception as e:
+        return None, f"解析错误: {str(e)}"
+
+    if parts is None:
+        return None, "不是有效的 OTPAuth URI"
 
-        if parsed.scheme != "otpauth":
-            return None, "不是有效的 OTPAuth URI"
+    return _parse_otpauth_parts(uri, *parts)
 
-        # 获取类型
-        otp_type = parsed.netloc
 
+def _parse_otpauth_parts(uri, otp_type, path, query):
+    """解析已拆分的 otpauth URI"""
+    try:
         # 获取标签
-        label = unquote(parsed.path.lstrip("/"))
+        label = unquote(path.lstrip("/"))
 
-        # 解析查询参数
-        params = parse_qs(parsed.query)
+        # 解析查询参数，重复的参数只保留第一个
+        params = {}
+        for pair in query.split("&"):
+            key, _, value = pair.partition("=")
+            if value:
+                params.setdefault(key, value)
 
         # 提取密钥
-        secret = params.get("secret", [None])[0]
+        secret = params.get("secret")
         if not secret:
             return None, "未找到密钥参数"
+        secret = unquote_plus(secret)
 
         # 提取其他参数
-        issuer = params.get("issuer", [None])[0]
+        issuer = params.get("issuer")
         if issuer:
-            issuer = unquote(issuer)
-
-        # 提取账号
-        if ":" in label:
-            parts = label.split(":", 1)
-            label_issuer = parts[0]
-            account = parts[1]
-            if not issuer:
-                issuer = label_issuer
-        else:
+            issuer = unquote_plus(issuer)
+
+        # 提取账号，标签格式为 "发行者:账号" 或 "账号"
+        label_issuer, sep, account = label.partition(":")
+        if not sep:
             account = label
+        elif not issuer:
+            issuer = label_issuer
 
         # 其他可选参数
-        algorithm = params.get("algorithm", ["SHA1"])[0]
-        digits = params.get("digits", ["6"])[0]
-        period = params.get("period", ["30"])[0]
+        algorithm = params.get("algorithm", "SHA1")
+        digits = params.get("digits", "6")
+        period = params.get("period", "30")
 
         result = {
             "type": otp_type.upper(),
@@ -82,11 +161,23 @@ def parse_otpauth_uri(uri):
         return None, f"解析错误: {str(e)}"
 
 
-def decode_qr_pyzbar(image_path):
-    """使用 pyzbar 解码二维码"""
+def _read_gray(image_path):
+    """使用 OpenCV 以灰度图读取图片，读取失败返回 None"""
+    try:
+        cv2 = _load_cv2()
+        return cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    except Exception:
+        return None
+
+
+def decode_qr_pyzbar(image):
+    """使用 pyzbar 解码二维码，image 为图片路径或已读取的灰度图"""
     try:
-        image = Image.open(image_path)
-        decoded_objects = decode(image)
+        Image, decode, ZBarSymbol = _load_pyzbar()
+        if isinstance(image, str):
+            # 只扫描灰度图中的二维码
+            image = Image.open(image).convert("L")
+        decoded_objects = decode(image, symbols=[ZBarSymbol.QRCODE])
 
         if not decoded_objects:
             return None, "未检测到二维码"
@@ -99,15 +190,16 @@ def decode_qr_pyzbar(image_path):
         return None, f"解码失败: {str(e)}"
 
 
-def decode_qr_cv2(image_path):
-    """使用 OpenCV 解码二维码"""
+def decode_qr_cv2(image):
+    """使用 OpenCV 解码二维码，image 为图片路径或已读取的灰度图"""
     try:
-        image = cv2.imread(image_path)
-        if image is None:
-            return None, "无法读取图片"
+        if isinstance(image, str):
+            # 二维码检测只需要灰度图
+            image = _read_gray(image)
+            if image is None:
+                return None, "无法读取图片"
 
-        detector = cv2.QRCodeDetector()
-        data, vertices, _ = detector.detectAndDecode(image)
+        data = decode_qr_gray(image)
 
         if not data:
             return None, "未检测到二维码"
@@ -120,15 +212,20 @@ def decode_qr_cv2(image_path):
 
 def decode_qr_image(image_path):
     """解码二维码图片"""
-    # 优先使用 cv2
+    image = image_path
+
+    # 优先使用 cv2，读取的灰度图同时供 pyzbar 使用
     if CV2_AVAILABLE:
-        result, error = decode_qr_cv2(image_path)
-        if result:
-            return result, None
+        gray = _read_gray(image_path)
+        if gray is not None:
+            image = gray
+            result, error = decode_qr_cv2(gray)
+            if result:
+                return result, None
 
     # 备选使用 pyzbar
     if PYZBAR_AVAILABLE:
-        result, error = decode_qr_pyzbar(image_path)
+        result, error = decode_qr_pyzbar(image)
         if result:
             return result, None
 
@@ -138,22 +235,27 @@ def decode_qr_image(image_path):
     return None, "无法解码二维码"
 
 
-def scan_qr_and_extract_2fa(image_path):
+def extract_2fa_from_text(qr_data):
     """
-    扫描二维码并提取 2FA 信息
+    从二维码内容中提取 2FA 信息
     """
-    # 解码二维码
-    qr_data, error = decode_qr_image(image_path)
-    if error:
-        return None, error
+    parts = _split_otpauth_uri(qr_data)
 
     # 检查是否是 otpauth URI
-    if not qr_data.startswith("otpauth://"):
+    if parts is None:
         return None, f"不是 2FA 二维码。内容: {qr_data}"
 
     # 解析 otpauth URI
-    info, error = parse_otpauth_uri(qr_data)
+    return _parse_otpauth_parts(qr_data, *parts)
+
+
+def scan_qr_and_extract_2fa(image_path):
+    """
+    扫描二维码并提取 2FA 信息
+    """
+    # 解码二维码
+    qr_data, error = decode_qr_image(image_path)
     if error:
         return None, error
 
-    return info, None
+    return extract_2fa_from_text(qr_data)
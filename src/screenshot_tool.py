@@ -2,6 +2,33 @@ import tkinter as tk
 from PIL import Image, ImageGrab, ImageTk
 import ctypes
 
+# 导入 mss，截图比 ImageGrab 更快
+try:
+    import mss
+
+    MSS_AVAILABLE = True
+except ImportError:
+    MSS_AVAILABLE = False
+
+
+def grab_screen():
+    """截取主屏幕，优先使用 mss"""
+    if MSS_AVAILABLE:
+        try:
+            with mss.mss() as sct:
+                # 显示器列表不一定以主屏幕开头，按左上角 (0, 0) 查找主屏幕
+                primary = next(
+                    (m for m in sct.monitors[1:] if m["left"] == 0 and m["top"] == 0),
+                    None,
+                )
+                if primary is not None:
+                    shot = sct.grab(primary)
+                    return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+        except Exception:
+            pass
+
+    return ImageGrab.grab(all_screens=False)
+
 
 class ScreenshotTool:
     """屏幕截图工具类"""
@@ -90,7 +117,7 @@ class ScreenshotTool:
     def _capture_screen(self):
         """截取整个屏幕并显示选择界面"""
         # 截取整个屏幕
-        self.screenshot_image = ImageGrab.grab(all_screens=False)
+        self.screenshot_image = grab_screen()
 
         # 保存原始截图尺寸
         self.original_width = self.screenshot_image.width
@@ -120,13 +147,13 @@ class ScreenshotTool:
         self.scale_x = self.original_width / self.screen_width
         self.scale_y = self.original_height / self.screen_height
 
-        # 将截图缩放到显示尺寸用于预览
+        # 将截图缩放到显示尺寸用于预览，预览图只用于框选，使用较快的双线性插值
         if (
             self.original_width != self.screen_width
             or self.original_height != self.screen_height
         ):
             self.display_image = self.screenshot_image.resize(
-                (self.screen_width, self.screen_height), Image.Resampling.LANCZOS
+                (self.screen_width, self.screen_height), Image.Resampling.BILINEAR
             )
         else:
             self.display_image = self.screenshot_image
@@ -294,41 +321,40 @@ class ScreenshotTool:
                 pass
 
 
-def capture_and_decode(parent_window, callback):
+def decode_capture(image):
     """
-    截图并解码二维码
+    解码截图中的二维码并提取 2FA 信息
+    不访问 Tk 控件，可在后台线程中调用
     """
+    try:
+        import numpy as np
+        from src.qr_scanner import extract_2fa_from_text, decode_qr_gray
 
-    def on_capture(image):
-        """截图完成回调"""
-        from qr_scanner import parse_otpauth_uri
+        # 二维码检测只需要灰度图
+        gray = np.asarray(image.convert("L"))
 
-        try:
-            import cv2
-            import numpy as np
+        # 解码二维码
+        data = decode_qr_gray(gray)
 
-            # 将 PIL 图像转换为 OpenCV 格式
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        if not data:
+            return None, "未检测到二维码，请确保二维码完整清晰"
 
-            # 解码二维码
-            detector = cv2.QRCodeDetector()
-            data, vertices, _ = detector.detectAndDecode(cv_image)
+        # 解析 otpauth URI
+        return extract_2fa_from_text(data)
 
-            if not data:
-                callback(None, "未检测到二维码，请确保二维码完整清晰")
-                return
+    except Exception as e:
+        return None, f"处理失败: {str(e)}"
 
-            # 检查是否是 otpauth URI
-            if not data.startswith("otpauth://"):
-                callback(None, f"不是 2FA 二维码\n内容: {data}")
-                return
 
-            # 解析 URI
-            info, error = parse_otpauth_uri(data)
-            callback(info, error)
+def capture_and_decode(parent_window, callback):
+    """
+    截图并解码二维码
+    解码在当前线程进行，需要后台解码时使用 ScreenshotTool 和 decode_capture
+    """
 
-        except Exception as e:
-            callback(None, f"处理失败: {str(e)}")
+    def on_capture(image):
+        """截图完成回调"""
+        callback(*decode_capture(image))
 
     # 创建截图工具并启动
     tool = ScreenshotTool(callback=on_capture)
@@ -1,9 +1,25 @@
+import base64
 import json
 import os
+import shutil
+import tempfile
+import threading
 import uuid
 import sys
 from datetime import datetime
+from functools import lru_cache, wraps
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+# 导入 orjson，序列化比标准库 json 更快
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # 应用名称
 APP_NAME = "AuthVault"
@@ -12,10 +28,18 @@ APP_NAME = "AuthVault"
 DATA_FILE = "data.vault"
 KEY_FILE = "secret.key"
 
+# AES-GCM 加密数据的文件头，没有该文件头的数据按旧版 Fernet 格式解密
+GCM_MAGIC = b"AVG1"
+GCM_NONCE_SIZE = 12
+
+# 备份文件头，之后依次为 4 字节元数据长度、元数据 JSON 和原始加密数据
+BACKUP_MAGIC = b"AVB1"
+
 
+@lru_cache(maxsize=1)
 def get_app_data_dir():
     """
-    获取应用数据目录
+    获取应用数据目录，结果在进程内缓存
     Windows: %LOCALAPPDATA%/AuthVault/
     Linux/Mac: ~/.authvault/
     """
@@ -28,12 +52,85 @@ def get_app_data_dir():
         app_dir = os.path.join(os.path.expanduser("~"), f".{APP_NAME.lower()}")
 
     # 确保目录存在
-    if not os.path.exists(app_dir):
-        os.makedirs(app_dir)
+    os.makedirs(app_dir, exist_ok=True)
 
     return app_dir
 
 
+def json_dumps(data):
+    """将数据序列化为紧凑的 UTF-8 JSON 字节串"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(raw):
+    """从 UTF-8 JSON 字节串反序列化数据"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+@lru_cache(maxsize=8)
+def _load_ciphers(key_file, mtime_ns):
+    """
+    读取密钥文件并创建加密器，按路径和修改时间缓存
+    Fernet 仅用于读取旧数据，新数据使用由同一密钥派生的 AES-GCM 密钥
+    """
+    with open(key_file, "rb") as f:
+        key = f.read()
+
+    gcm_key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"AuthVault AES-GCM",
+    ).derive(base64.urlsafe_b64decode(key.strip()))
+
+    return Fernet(key), AESGCM(gcm_key)
+
+
+def write_atomic(path, *chunks):
+    """
+    原子写入文件：依次将各数据块写入临时文件并落盘，再替换目标文件
+    返回写入后文件的状态信息
+    """
+    # 每次使用唯一的临时文件名，并发写入同一目标时互不覆盖
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".",
+        suffix=".tmp",
+        dir=os.path.dirname(os.path.abspath(path)),
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # 写入失败时清理临时文件，原文件保持不变
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return st
+
+
+def _synchronized(method):
+    """在实例锁内执行方法，使缓存、索引和数据文件的读写互斥"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class StorageManager:
     """存储管理器类"""
 
@@ -45,6 +142,18 @@ class StorageManager:
         self.data_file = data_file or os.path.join(app_dir, DATA_FILE)
         self.key_file = key_file or os.path.join(app_dir, KEY_FILE)
         self.cipher = None
+        self.aead = None
+
+        # 解密后的数据缓存，文件修改时间或大小变化时失效
+        self._cache = None
+        self._cache_stamp = None
+
+        # 账号索引：ID -> 列表位置，名称 -> ID
+        self._pos_by_id = {}
+        self._id_by_name = {}
+
+        # 后台线程（备份、恢复）与界面线程可能同时访问
+        self._lock = threading.RLock()
 
         # 检查旧文件并迁移
         self._migrate_old_files()
@@ -52,9 +161,7 @@ class StorageManager:
         # 初始化加密
         self._init_encryption()
 
-        # 确保数据文件存在
-        if not os.path.exists(self.data_file):
-            self._save_data({"accounts": []})
+        # 数据文件在首次保存时创建
 
     def _migrate_old_files(self):
         """迁移旧版本的数据文件"""
@@ -75,8 +182,6 @@ class StorageManager:
         # 迁移密钥文件
         if os.path.exists(old_key_file) and not os.path.exists(self.key_file):
             try:
-                import shutil
-
                 shutil.copy2(old_key_file, self.key_file)
             except Exception as e:
                 return None
@@ -84,8 +189,6 @@ class StorageManager:
         # 迁移数据文件
         if os.path.exists(old_data_file) and not os.path.exists(self.data_file):
             try:
-                import shutil
-
                 shutil.copy2(old_data_file, self.data_file)
             except Exception as e:
                 return None
@@ -100,117 +203,162 @@ class StorageManager:
 
     def _init_encryption(self):
         """初始化加密"""
-        if not os.path.exists(self.key_file):
+        try:
+            st = os.stat(self.key_file)
+        except FileNotFoundError:
             key = Fernet.generate_key()
             with open(self.key_file, "wb") as f:
                 f.write(key)
-        else:
-            with open(self.key_file, "rb") as f:
-                key = f.read()
+            st = os.stat(self.key_file)
 
-        self.cipher = Fernet(key)
+        self.cipher, self.aead = _load_ciphers(self.key_file, st.st_mtime_ns)
 
-    def _load_data(self):
-        """加载数据"""
-        try:
-            with open(self.data_file, "rb") as f:
-                encrypted_data = f.read()
+    def _encrypt(self, plaintext):
+        """使用 AES-GCM 加密数据"""
+        nonce = os.urandom(GCM_NONCE_SIZE)
+        return GCM_MAGIC + nonce + self.aead.encrypt(nonce, plaintext, GCM_MAGIC)
 
-            if not encrypted_data:
-                return {"accounts": []}
+    def _decrypt(self, token):
+        """解密数据，兼容旧版 Fernet 格式"""
+        if token.startswith(GCM_MAGIC):
+            start = len(GCM_MAGIC)
+            nonce = token[start : start + GCM_NONCE_SIZE]
+            return self.aead.decrypt(nonce, token[start + GCM_NONCE_SIZE :], GCM_MAGIC)
 
-            decrypted_data = self.cipher.decrypt(encrypted_data)
-            return json.loads(decrypted_data.decode("utf-8"))
+        return self.cipher.decrypt(token)
+
+    def _cached_data(self):
+        """获取解密后的数据，文件未变化时直接使用缓存"""
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            # 尚未保存过数据
+            if self._cache is None or self._cache_stamp is not None:
+                self._set_cache({"accounts": []}, None)
+            return self._cache
+
+        try:
+            stamp = (st.st_mtime_ns, st.st_size)
+            if self._cache is None or stamp != self._cache_stamp:
+                with open(self.data_file, "rb") as f:
+                    encrypted_data = f.read()
+
+                if encrypted_data:
+                    decrypted_data = self._decrypt(encrypted_data)
+                    data = json_loads(decrypted_data)
+                else:
+                    data = {"accounts": []}
+
+                self._set_cache(data, stamp)
         except Exception as e:
             print(f"加载数据失败: {e}")
-            return {"accounts": []}
+            self._set_cache({"accounts": []}, None)
+
+        return self._cache
+
+    def _set_cache(self, data, stamp):
+        """更新数据缓存及账号索引"""
+        self._cache = data
+        self._cache_stamp = stamp
+
+        accounts = data.get("accounts", [])
+        self._pos_by_id = {a["id"]: i for i, a in enumerate(accounts)}
+        self._id_by_name = {a["name"]: a["id"] for a in accounts}
+
+    def _load_data(self):
+        """
+        加载数据，返回可修改的浅拷贝
+        账号列表是新列表，账号字典与缓存共享，修改账号前需先复制该账号
+        """
+        data = dict(self._cached_data())
+        data["accounts"] = list(data.get("accounts", []))
+        return data
 
     def _save_data(self, data):
         """保存数据"""
         try:
-            json_data = json.dumps(data, ensure_ascii=False, indent=2)
-            encrypted_data = self.cipher.encrypt(json_data.encode("utf-8"))
+            encrypted_data = self._encrypt(json_dumps(data))
+
+            st = write_atomic(self.data_file, encrypted_data)
 
-            with open(self.data_file, "wb") as f:
-                f.write(encrypted_data)
+            # 更新缓存
+            self._set_cache(data, (st.st_mtime_ns, st.st_size))
 
             return True
         except Exception as e:
             print(f"保存数据失败: {e}")
             return False
 
+    @_synchronized
     def get_all_accounts(self):
-        """获取所有账号"""
-        data = self._load_data()
-        return data.get("accounts", [])
+        """获取所有账号，返回的账号字典与缓存共享，调用方不得修改"""
+        return list(self._cached_data().get("accounts", []))
 
+    @_synchronized
     def get_account(self, account_id):
-        """根据 ID 获取账号"""
-        accounts = self.get_all_accounts()
-        for account in accounts:
-            if account["id"] == account_id:
-                return account
-        return None
-
+        """根据 ID 获取账号，返回的账号字典与缓存共享，调用方不得修改"""
+        data = self._cached_data()
+        pos = self._pos_by_id.get(account_id)
+        if pos is None:
+            return None
+        return data["accounts"][pos]
+
+    @_synchronized
     def add_account(self, name, secret, note=""):
-        """添加账号"""
+        """添加账号，成功时返回新账号的 ID"""
         try:
             data = self._load_data()
 
             # 检查账号名是否已存在
-            for account in data["accounts"]:
-                if account["name"] == name:
-                    return False, "账号名称已存在"
+            if name in self._id_by_name:
+                return False, "账号名称已存在"
 
-            # 创建新账号
+            # 创建新账号，创建时间与更新时间一致
+            now = datetime.now().isoformat()
             new_account = {
                 "id": str(uuid.uuid4()),
                 "name": name,
                 "secret": secret,
                 "note": note,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
+                "created_at": now,
+                "updated_at": now,
             }
 
             data["accounts"].append(new_account)
 
             if self._save_data(data):
-                return True, "添加成功"
+                return True, new_account["id"]
             else:
                 return False, "保存失败"
 
         except Exception as e:
             return False, str(e)
 
+    @_synchronized
     def update_account(self, account_id, name, secret, note=""):
         """更新账号"""
         try:
             data = self._load_data()
 
             # 查找账号
-            account_found = False
-            for account in data["accounts"]:
-                if account["id"] == account_id:
-                    # 检查新名称是否与其他账号冲突
-                    if account["name"] != name:
-                        for other_account in data["accounts"]:
-                            if (
-                                other_account["id"] != account_id
-                                and other_account["name"] == name
-                            ):
-                                return False, "账号名称已存在"
-
-                    # 更新账号信息
-                    account["name"] = name
-                    account["secret"] = secret
-                    account["note"] = note
-                    account["updated_at"] = datetime.now().isoformat()
-                    account_found = True
-                    break
-
-            if not account_found:
+            pos = self._pos_by_id.get(account_id)
+            if pos is None:
                 return False, "账号不存在"
 
+            # 复制后再修改，不影响缓存中的原账号
+            account = dict(data["accounts"][pos])
+            data["accounts"][pos] = account
+
+            # 检查新名称是否与其他账号冲突
+            if account["name"] != name and name in self._id_by_name:
+                return False, "账号名称已存在"
+
+            # 更新账号信息
+            account["name"] = name
+            account["secret"] = secret
+            account["note"] = note
+            account["updated_at"] = datetime.now().isoformat()
+
             if self._save_data(data):
                 return True, "更新成功"
             else:
@@ -219,19 +367,17 @@ class StorageManager:
         except Exception as e:
             return False, str(e)
 
+    @_synchronized
     def delete_account(self, account_id):
         """删除账号"""
         try:
             data = self._load_data()
 
-            # 过滤掉要删除的账号
-            original_count = len(data["accounts"])
-            data["accounts"] = [
-                acc for acc in data["accounts"] if acc["id"] != account_id
-            ]
-
-            if len(data["accounts"]) == original_count:
+            # 删除账号
+            pos = self._pos_by_id.get(account_id)
+            if pos is None:
                 return False, "账号不存在"
+            del data["accounts"][pos]
 
             if self._save_data(data):
                 return True, "删除成功"
@@ -241,38 +387,47 @@ class StorageManager:
         except Exception as e:
             return False, str(e)
 
+    @_synchronized
     def backup(self, backup_file):
-        """备份数据到文件"""
+        """备份数据到文件，直接复制已加密的数据文件，无需重新加密"""
         try:
-            data = self._load_data()
-
-            # 创建备份数据
-            backup_data = {
-                "backup_time": datetime.now().isoformat(),
-                "version": "1.0",
-                "data": data,
-            }
-
-            # 加密备份数据
-            json_data = json.dumps(backup_data, ensure_ascii=False, indent=2)
-            encrypted_data = self.cipher.encrypt(json_data.encode("utf-8"))
-
-            with open(backup_file, "wb") as f:
-                f.write(encrypted_data)
+            try:
+                with open(self.data_file, "rb") as f:
+                    vault_data = f.read()
+            except FileNotFoundError:
+                # 尚未保存过数据，备份空数据
+                vault_data = self._encrypt(json_dumps(self._cached_data()))
+
+            # 备份元数据
+            header = json_dumps(
+                {"backup_time": datetime.now().isoformat(), "version": "2.0"}
+            )
+
+            # 分块写入，避免为拼接整个备份再复制一份数据
+            write_atomic(
+                backup_file,
+                BACKUP_MAGIC + len(header).to_bytes(4, "big") + header,
+                vault_data,
+            )
 
             return True, "备份成功"
 
         except Exception as e:
             return False, str(e)
 
+    @_synchronized
     def restore(self, backup_file):
         """从备份文件恢复数据"""
         try:
             with open(backup_file, "rb") as f:
                 encrypted_data = f.read()
 
-            decrypted_data = self.cipher.decrypt(encrypted_data)
-            backup_data = json.loads(decrypted_data.decode("utf-8"))
+            if encrypted_data.startswith(BACKUP_MAGIC):
+                return self._restore_vault(encrypted_data)
+
+            # 旧版备份：整体加密的备份数据
+            decrypted_data = self._decrypt(encrypted_data)
+            backup_data = json_loads(decrypted_data)
 
             # 提取实际数据
             if "data" in backup_data:
@@ -289,6 +444,20 @@ class StorageManager:
         except Exception as e:
             return False, f"恢复失败: {str(e)}"
 
+    def _restore_vault(self, backup_data):
+        """从新版备份恢复：跳过元数据，其余部分即为加密的数据文件"""
+        start = len(BACKUP_MAGIC) + 4
+        start += int.from_bytes(backup_data[len(BACKUP_MAGIC) : start], "big")
+        vault_data = backup_data[start:]
+
+        # 先解密校验，确保备份可用且密钥匹配
+        data = json_loads(self._decrypt(vault_data))
+
+        st = write_atomic(self.data_file, vault_data)
+        self._set_cache(data, (st.st_mtime_ns, st.st_size))
+        return True, "恢复成功"
+
+    @_synchronized
     def export_plain(self, export_file):
         try:
             data = self._load_data()
@@ -298,6 +467,7 @@ class StorageManager:
         except Exception as e:
             return False, str(e)
 
+    @_synchronized
     def import_plain(self, import_file):
         try:
             with open(import_file, "r", encoding="utf-8") as f: